@@ -1,17 +1,27 @@
+import functools
 import hashlib
 import json
+import os
 import random
+import socket
 import tempfile
+import threading
+import time
 import traceback
+from contextlib import contextmanager
 from datetime import datetime
 from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
 
 from logging import getLogger
 
 import requests
+import sqlalchemy
 from flask import (
     Blueprint,
     abort,
+    g,
+    has_app_context,
     jsonify,
     redirect,
     render_template,
@@ -41,6 +51,7 @@ from wtforms.validators import DataRequired, InputRequired, ValidationError
 
 import CTFd.utils.scores
 from CTFd.api import CTFd_API_v1
+from CTFd.cache import cache
 from CTFd.api.v1.challenges import Challenge, ChallengeList
 from CTFd.api.v1.scoreboard import ScoreboardDetail
 from CTFd.forms import BaseForm
@@ -64,8 +75,9 @@ from CTFd.plugins import (
     register_admin_plugin_menu_bar,
     register_plugin_assets_directory,
 )
+from CTFd.plugins.migrations import upgrade
 from CTFd.plugins.challenges import CHALLENGE_CLASSES, BaseChallenge, get_chal_class
-from CTFd.plugins.flags import get_flag_class
+from CTFd.plugins.flags import FLAG_CLASSES, get_flag_class
 from CTFd.schemas.tags import TagSchema
 from CTFd.utils.config import get_themes, is_teams_mode
 from CTFd.utils.dates import unix_time
@@ -84,11 +96,76 @@ from CTFd.utils.user import authed, get_current_team, get_current_user, get_ip,
 
 from typing import TYPE_CHECKING
 
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
 if TYPE_CHECKING:
     from podman.domain.containers import Container
 
 logger = getLogger("podman_challenges")
 
+# Seconds a freshly created container has to pass its readiness probe before it
+# is reported as failed and may be reverted without waiting for the revert timer.
+READINESS_TIMEOUT = 60
+# Seconds a single TCP readiness probe may block before giving up.
+READINESS_PROBE_TIMEOUT = 1.0
+# Seconds a connected probe waits for the peer to close before treating it as ready.
+READINESS_RECV_TIMEOUT = 0.5
+
+# CPU percentage at or below which a container without network traffic is idle.
+IDLE_CPU_THRESHOLD = 1.0
+
+STATUS_STARTING = "starting"
+STATUS_RUNNING = "running"
+STATUS_FAILED = "failed"
+STATUS_PAUSED = "paused"
+
+# Default seconds between stats collections when none is configured.
+STATS_DEFAULT_INTERVAL = 30
+# Number of stats samples kept per container.
+STATS_WINDOW = 20
+
+# Seconds the image catalog used by the challenge forms and bulk import is cached.
+REPOSITORY_CACHE_TTL = 60
+
+# Fields accepted for each challenge in a bulk import manifest.
+IMPORT_FIELDS = {
+    "name",
+    "description",
+    "category",
+    "value",
+    "state",
+    "max_attempts",
+    "podman_image",
+    "idle_timeout",
+    "flags",
+    "tags",
+}
+
+# (config key, unix time, images) of the last catalog lookup.
+_repository_cache = None
+
+# Environment variable naming the file slow traces are appended to as JSON lines.
+TRACE_FILE_ENV = "PODMAN_CHALLENGES_TRACE_FILE"
+# Number of slow traces kept for the status page.
+TRACE_HISTORY = 50
+# Cache key holding the most recent slow traces, newest last. It is shared by all
+# CTFd workers.
+TRACE_CACHE_KEY = "podman_challenges_traces"
+
+# Cache key holding the rolling window of stats samples per container id. It is
+# shared by all CTFd workers.
+STATS_CACHE_KEY = "podman_challenges_stats"
+# Cache key held by the one worker collecting stats during the current interval.
+STATS_LOCK_KEY = "podman_challenges_stats_lock"
+
 
 class PodmanConfig(db.Model):
     """
@@ -107,6 +184,18 @@ class PodmanConfig(db.Model):
 
     repositories = db.Column("repositories", db.String(1024), index=True)
 
+    # Hostname players are shown for published ports. Defaults to the CTFd host.
+    public_host = db.Column("public_host", db.String(256))
+
+    # Seconds between background stats collections. 0 disables collection.
+    stats_interval = db.Column(
+        "stats_interval", db.Integer, default=STATS_DEFAULT_INTERVAL
+    )
+
+    # Launches, reverts and teardowns slower than this many milliseconds are traced.
+    # 0 traces every one, empty disables tracing.
+    trace_threshold = db.Column("trace_threshold", db.Integer)
+
 
 class PodmanChallengeTracker(db.Model):
     """
@@ -122,6 +211,8 @@ class PodmanChallengeTracker(db.Model):
     instance_id = db.Column("instance_id", db.String(128), index=True)
     ports = db.Column("ports", db.String(128), index=True)
     uri = db.Column("uri", db.String(128), index=True)
+    status = db.Column("status", db.String(32), index=True, default=STATUS_STARTING)
+    last_active = db.Column("last_active", db.Integer, index=True)
 
 
 class PodmanConfigForm(BaseForm):
@@ -142,6 +233,18 @@ class PodmanConfigForm(BaseForm):
     )
 
     repositories = SelectMultipleField("Repositories")
+    public_host = StringField(
+        "Public Host",
+        description="Hostname players connect to for published ports. Defaults to the hostname players use to reach CTFd",
+    )
+    stats_interval = StringField(
+        "Stats Interval",
+        description="Seconds between container stats collections for the status page and idle suspension. 0 disables both",
+    )
+    trace_threshold = StringField(
+        "Trace Threshold",
+        description="Trace launches, reverts and teardowns slower than this many milliseconds. 0 traces all of them, empty disables tracing",
+    )
     submit = SubmitField("Submit")
 
 
@@ -180,6 +283,18 @@ def define_podman_admin(app):
                 b.connection = connection
 
             b.uri = request.form["uri"]
+            b.public_host = request.form.get("public_host", "").strip() or None
+
+            try:
+                b.stats_interval = int(request.form["stats_interval"])
+            except:
+                print(traceback.print_exc())
+                b.stats_interval = STATS_DEFAULT_INTERVAL
+
+            try:
+                b.trace_threshold = int(request.form["trace_threshold"])
+            except:
+                b.trace_threshold = None
 
             try:
                 b.repositories = ",".join(
@@ -236,18 +351,158 @@ def define_podman_status(app):
     def podman_admin():
         podman_config = PodmanConfig.query.filter_by(id=1).first()
         podman_tracker = PodmanChallengeTracker.query.all()
+        # One cache read for the whole page
+        stats = get_all_stats()
         for i in podman_tracker:
+            window = stats.get(i.instance_id)
+            i.stats = window[-1] if window else None
             if is_teams_mode():
                 name = Teams.query.filter_by(id=i.team_id).first()
                 i.team_id = name.name
             else:
                 name = Users.query.filter_by(id=i.user_id).first()
                 i.user_id = name.name
-        return render_template("admin_podman_status.html", podmans=podman_tracker)
+        # Resource hogs first
+        podman_tracker.sort(
+            key=lambda i: (i.stats or {}).get("cpu") or -1.0, reverse=True
+        )
+        return render_template(
+            "admin_podman_status.html",
+            podmans=podman_tracker,
+            traces=list(reversed(cache.get(TRACE_CACHE_KEY) or [])),
+        )
 
     app.register_blueprint(admin_podman_status)
 
 
+def _new_span_id(bits: int = 64) -> str:
+    return "%0*x" % (bits // 4, random.getrandbits(bits))
+
+
+@contextmanager
+def trace_span(name: str, **attributes):
+    """
+    Records a span under the request's active trace. Does nothing unless the request
+    was started with trace_request. Spans are also forwarded to OpenTelemetry when it
+    is installed.
+    """
+    trace = g.get("podman_trace") if has_app_context() else None
+    if trace is None:
+        yield
+        return
+
+    span = {
+        "span_id": _new_span_id(),
+        "parent_span_id": trace["stack"][-1]["span_id"] if trace["stack"] else None,
+        "name": name,
+        "start_time_unix_nano": time.time_ns(),
+        "attributes": {k: str(v) for k, v in attributes.items()},
+        "status": "ok",
+    }
+    trace["stack"].append(span)
+    otel_span = (
+        otel_trace.get_tracer("podman_challenges").start_as_current_span(
+            name, attributes=span["attributes"]
+        )
+        if otel_trace
+        else None
+    )
+    try:
+        if otel_span:
+            with otel_span:
+                yield
+        else:
+            yield
+    except BaseException:
+        span["status"] = "error"
+        raise
+    finally:
+        span["end_time_unix_nano"] = time.time_ns()
+        span["duration_ms"] = (
+            span["end_time_unix_nano"] - span["start_time_unix_nano"]
+        ) / 1e6
+        trace["stack"].pop()
+        trace["spans"].append(span)
+
+
+def trace_attributes(**attributes) -> None:
+    """
+    Adds attributes to the innermost open span, for values only known mid-request.
+    """
+    trace = g.get("podman_trace") if has_app_context() else None
+    if trace and trace["stack"]:
+        trace["stack"][-1]["attributes"].update(
+            {k: str(v) for k, v in attributes.items()}
+        )
+
+
+def traced(func):
+    """
+    Wraps a helper in a span named after it.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with trace_span(func.__name__):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def export_trace(trace: Dict[str, Any]) -> None:
+    traces = cache.get(TRACE_CACHE_KEY) or []
+    cache.set(TRACE_CACHE_KEY, (traces + [trace])[-TRACE_HISTORY:], timeout=0)
+    record = json.dumps(trace)
+    logger.info("Slow trace: %s", record)
+    trace_file = os.environ.get(TRACE_FILE_ENV)
+    if trace_file:
+        try:
+            with open(trace_file, "a") as f:
+                f.write(record + "\n")
+        except OSError:
+            print(traceback.print_exc())
+
+
+@contextmanager
+def trace_request(name: str, podman: Optional[PodmanConfig], **attributes):
+    """
+    Starts a trace for a launch, revert or teardown when tracing is enabled, and
+    exports it if it took longer than the configured threshold.
+    """
+    if (
+        podman is None
+        or podman.trace_threshold is None
+        or not has_app_context()
+        or g.get("podman_trace") is not None
+    ):
+        yield
+        return
+
+    threshold = int(podman.trace_threshold)
+    g.podman_trace = {"trace_id": _new_span_id(128), "spans": [], "stack": []}
+    try:
+        with trace_span(name, **attributes):
+            yield
+    finally:
+        trace = g.pop("podman_trace")
+        root = trace["spans"][-1]
+        if root["duration_ms"] >= threshold:
+            spans = sorted(trace["spans"], key=lambda s: s["start_time_unix_nano"])
+            for span in spans:
+                span["trace_id"] = trace["trace_id"]
+            export_trace(
+                {
+                    "trace_id": trace["trace_id"],
+                    "name": name,
+                    "timestamp": root["start_time_unix_nano"] // 10**9,
+                    "duration_ms": root["duration_ms"],
+                    "status": root["status"],
+                    "attributes": root["attributes"],
+                    "spans": spans,
+                }
+            )
+
+
 kill_container = Namespace("nuke", description="Endpoint to nuke containers")
 
 
@@ -258,24 +513,43 @@ class KillContainerAPI(Resource):
         container = request.args.get("container")
         full = request.args.get("all")
         podman_config = PodmanConfig.query.filter_by(id=1).first()
-        podman_tracker = PodmanChallengeTracker.query.all()
-        if full == "true":
-            for c in podman_tracker:
-                delete_container(podman_config, c.instance_id)
-                PodmanChallengeTracker.query.filter_by(
-                    instance_id=c.instance_id
-                ).delete()
-                db.session.commit()
-
-        elif container != "null" and container in [
-            c.instance_id for c in podman_tracker
-        ]:
-            delete_container(podman_config, container)
-            PodmanChallengeTracker.query.filter_by(instance_id=container).delete()
-            db.session.commit()
+        with trace_request(
+            "KillContainerAPI.get", podman_config, container=container, all=full
+        ):
+            with trace_span("db.tracker_list"):
+                podman_tracker = PodmanChallengeTracker.query.all()
+            if full == "true":
+                for c in podman_tracker:
+                    delete_container(podman_config, c.instance_id)
+                    with trace_span("db.tracker_delete"):
+                        PodmanChallengeTracker.query.filter_by(
+                            instance_id=c.instance_id
+                        ).delete()
+                        db.session.commit()
+
+            elif container != "null" and container in [
+                c.instance_id for c in podman_tracker
+            ]:
+                for c in podman_tracker:
+                    if c.instance_id == container:
+                        # Match the team names recorded by launches and solves
+                        if c.team_id:
+                            owner = Teams.query.filter_by(id=c.team_id).first()
+                        else:
+                            owner = Users.query.filter_by(id=c.user_id).first()
+                        trace_attributes(
+                            team=owner.name if owner else c.team_id or c.user_id,
+                            image=c.podman_image,
+                        )
+                delete_container(podman_config, container)
+                with trace_span("db.tracker_delete"):
+                    PodmanChallengeTracker.query.filter_by(
+                        instance_id=container
+                    ).delete()
+                    db.session.commit()
 
-        else:
-            return False
+            else:
+                return False
         return True
 
 
@@ -301,6 +575,7 @@ def get_client_cert(podman):
 
 
 # For the Podman Config Page. Gets the Current Repositories available on the Podman Server.f
+@traced
 def get_repositories(
     podman: PodmanConfig, tags: bool = False, repos: Optional[List] = None
 ) -> List[str]:
@@ -320,6 +595,31 @@ def get_repositories(
     return list(set(result))
 
 
+def get_cached_repositories(
+    podman: PodmanConfig, refresh: bool = False
+) -> List[str]:
+    """
+    Returns the tagged images from the configured repositories, reusing the last lookup
+    for REPOSITORY_CACHE_TTL seconds unless `refresh` is set.
+    """
+    global _repository_cache
+
+    key = (podman.uri, podman.repositories)
+    now = unix_time(datetime.utcnow())
+    if (
+        not refresh
+        and _repository_cache is not None
+        and _repository_cache[0] == key
+        and now - _repository_cache[1] < REPOSITORY_CACHE_TTL
+    ):
+        return _repository_cache[2]
+
+    images = get_repositories(podman, tags=True, repos=podman.repositories)
+    _repository_cache = (key, now, images)
+    return images
+
+
+@traced
 def get_unavailable_ports(podman):
     with PodmanClient(base_url=podman.uri) as client:
         containers = client.containers.list()
@@ -333,7 +633,9 @@ def get_unavailable_ports(podman):
     return result
 
 
+@traced
 def get_required_ports(podman: PodmanConfig, image: str) -> List[str]:
+    trace_attributes(image=image)
     with PodmanClient(base_url=podman.uri) as client:
         image = client.images.get(image)
 
@@ -347,9 +649,11 @@ def get_required_ports(podman: PodmanConfig, image: str) -> List[str]:
     return result
 
 
+@traced
 def create_container(
     podman: PodmanConfig, image: str, team: str, portbl: List[int]
 ) -> "Container":
+    trace_attributes(image=image, team=team)
     needed_ports = get_required_ports(podman, image)
     team = hashlib.md5(team.encode("utf-8")).hexdigest()[:10]
     container_name = "%s_%s" % (image.split(":")[1], team)
@@ -372,10 +676,371 @@ def create_container(
 
     with PodmanClient(base_url=podman.uri) as client:
         container = client.containers.create(**container_config)
+        try:
+            container.start()
+            # Host port bindings are only populated once the container is running
+            container.reload()
+        except:
+            # The container name is fixed per team and image, so an untracked leftover
+            # would block every later launch.
+            container.remove(force=True)
+            raise
 
     return container
 
 
+def get_podman_host(podman: PodmanConfig) -> str:
+    """
+    Returns the host the podman API is reached on, which is where the plugin probes
+    published ports. Local socket connections publish on this host. Players may need a
+    different address, see get_public_host.
+    """
+    parsed = urlparse(str(podman.uri))
+    if parsed.scheme in ("unix", "") or not parsed.hostname:
+        return "localhost"
+    return parsed.hostname
+
+
+def get_public_host(podman: PodmanConfig) -> str:
+    """
+    Returns the host players are told to connect to for published ports: the
+    configured public host, or else the host of the player's request to CTFd.
+    """
+    if podman.public_host:
+        return podman.public_host
+    return urlparse("//" + request.host).hostname
+
+
+def probe_port(host: str, port: int) -> bool:
+    """
+    Checks that a service is listening behind a published port. Rootless podman's port
+    forwarder accepts connections before the service inside is up and then closes
+    them, so an immediate EOF or reset counts as not ready.
+    """
+    try:
+        with socket.create_connection(
+            (host, int(port)), timeout=READINESS_PROBE_TIMEOUT
+        ) as conn:
+            conn.settimeout(READINESS_RECV_TIMEOUT)
+            try:
+                # Services that speak first (ssh, ftp, ...) send a banner
+                return conn.recv(1) != b""
+            except socket.timeout:
+                # Still open and waiting for the client to speak
+                return True
+    except (OSError, ValueError):
+        return False
+
+
+def check_container_ready(
+    podman: PodmanConfig, instance_id: str, ports: List[str]
+) -> Optional[bool]:
+    """
+    Runs a single readiness probe against a container. The image HEALTHCHECK is used
+    when one is defined, otherwise every published port must accept and hold a TCP
+    connection.
+
+    :return: True when ready, False when it can never become ready, None while starting
+    """
+    with PodmanClient(base_url=podman.uri) as client:
+        if not client.containers.exists(instance_id):
+            return False
+        state = client.containers.get(instance_id).attrs.get("State", {})
+
+    if state.get("Status") in ("exited", "stopped", "dead"):
+        return False
+    if state.get("Status") != "running":
+        return None
+
+    health = state.get("Health") or state.get("Healthcheck")
+    if health and health.get("Status"):
+        if health["Status"] == "healthy":
+            return True
+        if health["Status"] == "unhealthy":
+            return False
+        return None
+
+    host = get_podman_host(podman)
+    if all(probe_port(host, port) for port in ports if port):
+        return True
+    return None
+
+
+def refresh_container_status(
+    podman: PodmanConfig, entry: PodmanChallengeTracker
+) -> str:
+    """
+    Moves a starting tracker entry to running or failed. Each call probes once so the
+    bounded wait happens across the client's status polls rather than in a worker.
+    """
+    if entry.status not in (None, STATUS_STARTING):
+        return entry.status
+
+    try:
+        ready = check_container_ready(
+            podman, entry.instance_id, entry.ports.split(",")
+        )
+    except:
+        print(traceback.print_exc())
+        ready = None
+
+    if ready is None and (
+        unix_time(datetime.utcnow()) - int(entry.timestamp)
+    ) >= READINESS_TIMEOUT:
+        logger.warning(
+            "Container %s did not become ready within %s seconds",
+            entry.instance_id,
+            READINESS_TIMEOUT,
+        )
+        ready = False
+
+    if ready is None:
+        return STATUS_STARTING
+
+    entry.status = STATUS_RUNNING if ready else STATUS_FAILED
+    entry.last_active = unix_time(datetime.utcnow())
+    db.session.commit()
+    return entry.status
+
+
+def _request_container_stats(
+    client: PodmanClient, instance_ids: List[str]
+) -> Optional[Dict[str, Any]]:
+    response = client.api.get(
+        "/containers/stats",
+        params={"containers": instance_ids, "stream": False},
+    )
+    if response.status_code >= 400:
+        logger.warning("Unable to collect container stats: %s", response.text)
+        return None
+
+    body = response.json()
+    if body.get("Error") and not body.get("Stats"):
+        logger.warning("Unable to collect container stats: %s", body["Error"])
+        return None
+    return body
+
+
+def get_container_stats(uri: str, instance_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetches a single stats sample for all of the given containers on the podman host
+    at `uri` in one API call. If any container in the batch has exited or is gone,
+    libpod fails the whole call. In that case those containers are dropped and the
+    batch is retried once.
+
+    :return: Stats keyed by container id
+    """
+    if not instance_ids:
+        return {}
+
+    with PodmanClient(base_url=uri) as client:
+        body = _request_container_stats(client, instance_ids)
+        if body is None:
+            live = {
+                c.id
+                for c in client.containers.list(all=True)
+                if c.status in ("running", "paused")
+            }
+            instance_ids = [i for i in instance_ids if i in live]
+            if instance_ids:
+                body = _request_container_stats(client, instance_ids)
+
+    if body is None:
+        return {}
+    return {item["ContainerID"]: item for item in body.get("Stats") or []}
+
+
+def pause_container(podman: PodmanConfig, instance_id: str) -> bool:
+    with PodmanClient(base_url=podman.uri) as client:
+        if client.containers.exists(instance_id):
+            client.containers.get(instance_id).pause()
+            return True
+
+    return False
+
+
+def resume_container(podman: PodmanConfig, entry: PodmanChallengeTracker) -> str:
+    """
+    Unpauses an instance suspended for being idle and restarts its idle clock. This is
+    only triggered by the owner viewing the challenge. Connections to the published
+    ports go straight to the container, so nothing resumes it on connect.
+    """
+    try:
+        with PodmanClient(base_url=podman.uri) as client:
+            client.containers.get(entry.instance_id).unpause()
+        entry.status = STATUS_RUNNING
+    except:
+        print(traceback.print_exc())
+        entry.status = STATUS_FAILED
+
+    entry.last_active = unix_time(datetime.utcnow())
+    db.session.commit()
+    return entry.status
+
+
+def suspend_idle_containers(
+    podman: PodmanConfig, samples: Dict[str, Dict[str, Any]]
+) -> None:
+    """
+    Pauses running instances whose latest stats sample shows no network traffic and
+    next to no CPU use, once they have been idle for longer than their challenge's
+    idle timeout. Called by the stats collector with the samples it just took.
+    """
+    timeouts = {
+        c.podman_image: int(c.idle_timeout or 0)
+        for c in PodmanChallenge.query.filter(PodmanChallenge.idle_timeout > 0)
+    }
+    if not timeouts:
+        return
+
+    now = unix_time(datetime.utcnow())
+    entries = (
+        PodmanChallengeTracker.query.filter_by(status=STATUS_RUNNING)
+        .filter(PodmanChallengeTracker.podman_image.in_(timeouts.keys()))
+        .all()
+    )
+    for entry in entries:
+        sample = samples.get(entry.instance_id)
+        if sample is None:
+            continue
+        # A first sample has no previous one to measure activity against
+        if (
+            entry.last_active is None
+            or sample["net_rate"] is None
+            or sample["cpu"] is None
+            or sample["net_rate"] > 0
+            or sample["cpu"] > IDLE_CPU_THRESHOLD
+        ):
+            entry.last_active = now
+
+        if now - int(entry.last_active) >= timeouts[entry.podman_image]:
+            logger.info(
+                "Pausing idle container %s (%s)", entry.instance_id, entry.podman_image
+            )
+            try:
+                if pause_container(podman, entry.instance_id):
+                    entry.status = STATUS_PAUSED
+            except:
+                print(traceback.print_exc())
+
+    db.session.commit()
+
+
+def collect_container_stats(interval: int = STATS_DEFAULT_INTERVAL) -> None:
+    """
+    Samples stats for every tracked container, with one batched call per podman host,
+    appends them to the rolling window in CTFd's cache and pauses idle instances.
+    Starting instances are probed first, so READINESS_TIMEOUT applies even when
+    their owner is not polling PodmanStatus.
+    """
+    podman = PodmanConfig.query.filter_by(id=1).first()
+    if podman:
+        for entry in PodmanChallengeTracker.query.filter_by(
+            status=STATUS_STARTING
+        ).all():
+            refresh_container_status(podman, entry)
+
+    hosts: Dict[str, List[str]] = {}
+    # Exited (failed) instances stay tracked until reverted but have no stats
+    for entry in PodmanChallengeTracker.query.filter(
+        PodmanChallengeTracker.status.in_((STATUS_RUNNING, STATUS_PAUSED))
+    ):
+        uri = entry.uri or (podman.uri if podman else None)
+        if uri:
+            hosts.setdefault(uri, []).append(entry.instance_id)
+
+    now = time.time()
+    samples: Dict[str, Dict[str, Any]] = {}
+    for uri, instance_ids in hosts.items():
+        try:
+            stats = get_container_stats(uri, instance_ids)
+        except:
+            print(traceback.print_exc())
+            continue
+        for instance_id, item in stats.items():
+            samples[instance_id] = {
+                "time": now,
+                "cpu_nano": int(item.get("CPUNano", 0)),
+                "system_nano": int(item.get("SystemNano", 0)),
+                "mem_usage": int(item.get("MemUsage", 0)),
+                "mem_limit": int(item.get("MemLimit", 0)),
+                "mem_percent": float(item.get("MemPerc", 0)),
+                "net_input": int(item.get("NetInput", 0)),
+                "net_output": int(item.get("NetOutput", 0)),
+            }
+
+    tracked = {i for ids in hosts.values() for i in ids}
+    stats = get_all_stats()
+    windows: Dict[str, List[Dict[str, Any]]] = {}
+    for instance_id in tracked:
+        window = stats.get(instance_id, [])
+        sample = samples.get(instance_id)
+        if sample is not None:
+            previous = window[-1] if window else None
+            if previous and sample["time"] > previous["time"]:
+                sample["net_rate"] = (
+                    sample["net_input"]
+                    + sample["net_output"]
+                    - previous["net_input"]
+                    - previous["net_output"]
+                ) / (sample["time"] - previous["time"])
+            else:
+                sample["net_rate"] = None
+            # libpod's own CPU figure for a one-shot sample is the average since the
+            # container started, so measure usage over the last interval instead
+            cpu_delta = sample["cpu_nano"] - (previous or {}).get("cpu_nano", 0)
+            system_delta = sample["system_nano"] - (previous or {}).get(
+                "system_nano", 0
+            )
+            if previous and cpu_delta >= 0 and system_delta > 0:
+                sample["cpu"] = cpu_delta / system_delta * 100
+            else:
+                sample["cpu"] = None
+            window = (window + [sample])[-STATS_WINDOW:]
+        if window:
+            windows[instance_id] = window
+
+    cache.set(STATS_CACHE_KEY, windows, timeout=interval * 3)
+
+    if podman:
+        suspend_idle_containers(podman, samples)
+
+
+def get_all_stats() -> Dict[str, List[Dict[str, Any]]]:
+    return cache.get(STATS_CACHE_KEY) or {}
+
+
+def start_stats_collector(app) -> threading.Thread:
+    """
+    Starts a daemon thread that runs collect_container_stats at the configured
+    interval. Every CTFd worker starts one, but only the worker that takes the lock
+    in CTFd's cache collects during each interval.
+    """
+
+    def run():
+        while True:
+            interval = STATS_DEFAULT_INTERVAL
+            with app.app_context():
+                try:
+                    podman = PodmanConfig.query.filter_by(id=1).first()
+                    if podman and podman.stats_interval is not None:
+                        interval = int(podman.stats_interval)
+                    if interval > 0 and cache.add(
+                        STATS_LOCK_KEY, True, timeout=interval
+                    ):
+                        collect_container_stats(interval)
+                except:
+                    print(traceback.print_exc())
+                finally:
+                    db.session.remove()
+            time.sleep(interval if interval > 0 else STATS_DEFAULT_INTERVAL)
+
+    thread = threading.Thread(target=run, name="podman-stats-collector", daemon=True)
+    thread.start()
+    return thread
+
+
+@traced
 def delete_container(podman: PodmanConfig, instance_id: str) -> bool:
     with PodmanClient(base_url=podman.uri) as client:
         if client.containers.exists(instance_id):
@@ -458,6 +1123,7 @@ class PodmanChallengeType(BaseChallenge):
             "name": challenge.name,
             "value": challenge.value,
             "podman_image": challenge.podman_image,
+            "idle_timeout": challenge.idle_timeout,
             "description": challenge.description,
             "category": challenge.category,
             "state": challenge.state,
@@ -521,39 +1187,48 @@ class PodmanChallengeType(BaseChallenge):
         data = request.form or request.get_json()
         submission = data["submission"].strip()
         podman = PodmanConfig.query.filter_by(id=1).first()
-        try:
-            if is_teams_mode():
-                podman_containers = (
-                    PodmanChallengeTracker.query.filter_by(
-                        podman_image=challenge.podman_image
-                    )
-                    .filter_by(team_id=team.id)
-                    .first()
-                )
-            else:
-                podman_containers = (
+        with trace_request(
+            "PodmanChallengeType.solve",
+            podman,
+            team=team.name if team else user.name,
+            image=challenge.podman_image,
+        ):
+            try:
+                with trace_span("db.tracker_lookup"):
+                    if is_teams_mode():
+                        podman_containers = (
+                            PodmanChallengeTracker.query.filter_by(
+                                podman_image=challenge.podman_image
+                            )
+                            .filter_by(team_id=team.id)
+                            .first()
+                        )
+                    else:
+                        podman_containers = (
+                            PodmanChallengeTracker.query.filter_by(
+                                podman_image=challenge.podman_image
+                            )
+                            .filter_by(user_id=user.id)
+                            .first()
+                        )
+
+                delete_container(podman, podman_containers.instance_id)
+                with trace_span("db.tracker_delete"):
                     PodmanChallengeTracker.query.filter_by(
-                        podman_image=challenge.podman_image
-                    )
-                    .filter_by(user_id=user.id)
-                    .first()
+                        instance_id=podman_containers.instance_id
+                    ).delete()
+            except:
+                pass
+            with trace_span("db.record_solve"):
+                solve = Solves(
+                    user_id=user.id,
+                    team_id=team.id if team else None,
+                    challenge_id=challenge.id,
+                    ip=get_ip(req=request),
+                    provided=submission,
                 )
-
-            delete_container(podman, podman_containers.instance_id)
-            PodmanChallengeTracker.query.filter_by(
-                instance_id=podman_containers.instance_id
-            ).delete()
-        except:
-            pass
-        solve = Solves(
-            user_id=user.id,
-            team_id=team.id if team else None,
-            challenge_id=challenge.id,
-            ip=get_ip(req=request),
-            provided=submission,
-        )
-        db.session.add(solve)
-        db.session.commit()
+                db.session.add(solve)
+                db.session.commit()
         # trying if this solces the detached instance error...
         # db.session.close()
 
@@ -585,6 +1260,8 @@ class PodmanChallenge(Challenges):
     __mapper_args__ = {"polymorphic_identity": "podman"}
     id = db.Column(None, db.ForeignKey("challenges.id"), primary_key=True)
     podman_image = db.Column(db.String(128), index=True)
+    # Seconds without activity before an instance is paused. 0 disables suspension.
+    idle_timeout = db.Column(db.Integer, default=0)
 
 
 # API
@@ -602,80 +1279,100 @@ class ContainerAPI(Resource):
         if not container:
             return abort(403)
         podman = PodmanConfig.query.filter_by(id=1).first()
-        containers = PodmanChallengeTracker.query.all()
-        if container not in get_repositories(podman, tags=True):
-            return abort(403)
-        if is_teams_mode():
-            session = get_current_team()
-            # First we'll delete all old podman containers (+2 hours)
-            for i in containers:
-                if (
-                    int(session.id) == int(i.team_id)
-                    and (unix_time(datetime.utcnow()) - int(i.timestamp)) >= 7200
-                ):
-                    delete_container(podman, i.instance_id)
-                    PodmanChallengeTracker.query.filter_by(
-                        instance_id=i.instance_id
-                    ).delete()
-                    db.session.commit()
-            check = (
-                PodmanChallengeTracker.query.filter_by(team_id=session.id)
-                .filter_by(podman_image=container)
-                .first()
-            )
-        else:
-            session = get_current_user()
-            for i in containers:
-                if (
-                    int(session.id) == int(i.user_id)
-                    and (unix_time(datetime.utcnow()) - int(i.timestamp)) >= 7200
-                ):
-                    delete_container(podman, i.instance_id)
-                    PodmanChallengeTracker.query.filter_by(
-                        instance_id=i.instance_id
-                    ).delete()
-                    db.session.commit()
-            check = (
-                PodmanChallengeTracker.query.filter_by(user_id=session.id)
-                .filter_by(podman_image=container)
-                .first()
-            )
-        # If this container is already created, we don't need another one.
-        if (
-            check != None
-            and not (unix_time(datetime.utcnow()) - int(check.timestamp)) >= 300
-        ):
-            return abort(403)
-        # The exception would be if we are reverting a box. So we'll delete it if it exists and has been around for more than 5 minutes.
-        elif check != None:
-            delete_container(podman, check.instance_id)
+        with trace_request("ContainerAPI.get", podman, image=container):
+            with trace_span("db.tracker_list"):
+                containers = PodmanChallengeTracker.query.all()
+            if container not in get_repositories(podman, tags=True):
+                return abort(403)
             if is_teams_mode():
-                PodmanChallengeTracker.query.filter_by(team_id=session.id).filter_by(
-                    podman_image=container
-                ).delete()
+                session = get_current_team()
+                trace_attributes(team=session.name)
+                # First we'll delete all old podman containers (+2 hours)
+                for i in containers:
+                    if (
+                        int(session.id) == int(i.team_id)
+                        and (unix_time(datetime.utcnow()) - int(i.timestamp)) >= 7200
+                    ):
+                        delete_container(podman, i.instance_id)
+                        with trace_span("db.tracker_delete"):
+                            PodmanChallengeTracker.query.filter_by(
+                                instance_id=i.instance_id
+                            ).delete()
+                            db.session.commit()
+                with trace_span("db.tracker_lookup"):
+                    check = (
+                        PodmanChallengeTracker.query.filter_by(team_id=session.id)
+                        .filter_by(podman_image=container)
+                        .first()
+                    )
             else:
-                PodmanChallengeTracker.query.filter_by(user_id=session.id).filter_by(
-                    podman_image=container
-                ).delete()
-            db.session.commit()
-        portsbl = get_unavailable_ports(podman)
-        created: Container = create_container(podman, container, session.name, portsbl)
-        ports = created.ports.values()
-
-        logger.warn("Ports: %s", ports)
-
-        entry = PodmanChallengeTracker(
-            team_id=session.id if is_teams_mode() else None,
-            user_id=session.id if not is_teams_mode() else None,
-            podman_image=container,
-            timestamp=unix_time(datetime.utcnow()),
-            revert_time=unix_time(datetime.utcnow()) + 300,
-            instance_id=created.id,
-            ports=",".join([p[0]["HostPort"] for p in ports]),
-            uri=str(podman.uri),
-        )
-        db.session.add(entry)
-        db.session.commit()
+                session = get_current_user()
+                trace_attributes(team=session.name)
+                for i in containers:
+                    if (
+                        int(session.id) == int(i.user_id)
+                        and (unix_time(datetime.utcnow()) - int(i.timestamp)) >= 7200
+                    ):
+                        delete_container(podman, i.instance_id)
+                        with trace_span("db.tracker_delete"):
+                            PodmanChallengeTracker.query.filter_by(
+                                instance_id=i.instance_id
+                            ).delete()
+                            db.session.commit()
+                with trace_span("db.tracker_lookup"):
+                    check = (
+                        PodmanChallengeTracker.query.filter_by(user_id=session.id)
+                        .filter_by(podman_image=container)
+                        .first()
+                    )
+            # If this container is already created, we don't need another one.
+            if (
+                check != None
+                and check.status != STATUS_FAILED
+                and not (unix_time(datetime.utcnow()) - int(check.timestamp)) >= 300
+            ):
+                return abort(403)
+            # The exception would be if we are reverting a box. So we'll delete it if it exists and has been around for more than 5 minutes,
+            # or if it never became ready.
+            elif check != None:
+                trace_attributes(revert=True)
+                delete_container(podman, check.instance_id)
+                with trace_span("db.tracker_delete"):
+                    if is_teams_mode():
+                        PodmanChallengeTracker.query.filter_by(
+                            team_id=session.id
+                        ).filter_by(podman_image=container).delete()
+                    else:
+                        PodmanChallengeTracker.query.filter_by(
+                            user_id=session.id
+                        ).filter_by(podman_image=container).delete()
+                    db.session.commit()
+            portsbl = get_unavailable_ports(podman)
+            try:
+                created: Container = create_container(
+                    podman, container, session.name, portsbl
+                )
+            except:
+                print(traceback.print_exc())
+                return abort(500)
+            ports = created.ports.values()
+
+            logger.warn("Ports: %s", ports)
+
+            with trace_span("db.tracker_record"):
+                entry = PodmanChallengeTracker(
+                    team_id=session.id if is_teams_mode() else None,
+                    user_id=session.id if not is_teams_mode() else None,
+                    podman_image=container,
+                    timestamp=unix_time(datetime.utcnow()),
+                    revert_time=unix_time(datetime.utcnow()) + 300,
+                    instance_id=created.id,
+                    ports=",".join([p[0]["HostPort"] for p in ports if p]),
+                    uri=str(podman.uri),
+                    status=STATUS_STARTING,
+                )
+                db.session.add(entry)
+                db.session.commit()
         # db.session.close()
         return
 
@@ -702,7 +1399,13 @@ class PodmanStatus(Resource):
             session = get_current_user()
             tracker = PodmanChallengeTracker.query.filter_by(user_id=session.id)
         data = list()
+        # Only the instance of the challenge being viewed counts as the player returning
+        viewing = request.args.get("name")
         for i in tracker:
+            if i.status == STATUS_PAUSED and i.podman_image == viewing:
+                status = resume_container(podman, i)
+            else:
+                status = refresh_container_status(podman, i)
             data.append(
                 {
                     "id": i.id,
@@ -713,7 +1416,8 @@ class PodmanStatus(Resource):
                     "revert_time": i.revert_time,
                     "instance_id": i.instance_id,
                     "ports": i.ports.split(","),
-                    "host": str(podman.hostname).split(":")[0],
+                    "host": get_public_host(podman),
+                    "status": status,
                 }
             )
         return {"success": True, "data": data}
@@ -733,7 +1437,7 @@ class PodmanAPI(Resource):
     def get(self):
         podman = PodmanConfig.query.filter_by(id=1).first()
         if podman is not None:
-            images = get_repositories(podman, tags=True, repos=podman.repositories)
+            images = get_cached_repositories(podman)
             if images:
                 data = list()
                 for i in images:
@@ -743,8 +1447,249 @@ class PodmanAPI(Resource):
         return {"success": False, "data": [{"name": "Error in Podman Config!"}]}, 400
 
 
+podman_stats_namespace = Namespace(
+    "podman_stats", description="Endpoint to retrieve collected container stats"
+)
+
+
+@podman_stats_namespace.route("", methods=["GET"])
+class PodmanStatsAPI(Resource):
+    """
+    The purpose of this API is to refresh the resource usage shown on the Podman Status page.
+    """
+
+    @admins_only
+    def get(self):
+        return {"success": True, "data": get_all_stats()}
+
+
+def parse_import_manifest(body: str, content_type: str) -> List[Dict[str, Any]]:
+    """
+    Parses a JSON or YAML bulk import manifest. The manifest is either a list of
+    challenges or a mapping with a `challenges` list.
+    """
+    if "yaml" in content_type or "yml" in content_type:
+        if yaml is None:
+            raise ValueError("YAML manifests require PyYAML to be installed")
+        manifest = yaml.safe_load(body)
+    else:
+        manifest = json.loads(body)
+
+    if isinstance(manifest, dict):
+        manifest = manifest.get("challenges")
+    if not isinstance(manifest, list):
+        raise ValueError("Manifest must contain a list of challenges")
+    return manifest
+
+
+def validate_import_manifest(
+    challenges: List[Dict[str, Any]], images: List[str]
+) -> List[str]:
+    errors = list()
+    for index, chal in enumerate(challenges):
+        if not isinstance(chal, dict):
+            errors.append("Challenge %d: must be a mapping" % index)
+            continue
+        name = chal.get("name") or index
+        unknown = set(chal) - IMPORT_FIELDS
+        if unknown:
+            errors.append(
+                "Challenge %s: unsupported fields %s"
+                % (name, ", ".join(sorted(unknown)))
+            )
+        if not chal.get("name"):
+            errors.append("Challenge %s: name is required" % name)
+        if chal.get("podman_image") not in images:
+            errors.append(
+                "Challenge %s: image '%s' is not in the configured repositories"
+                % (name, chal.get("podman_image"))
+            )
+        for field in ("value", "max_attempts", "idle_timeout"):
+            try:
+                int(chal.get(field) or 0)
+            except (TypeError, ValueError):
+                errors.append("Challenge %s: %s must be an integer" % (name, field))
+        if chal.get("state", "visible") not in ("visible", "hidden"):
+            errors.append("Challenge %s: state must be visible or hidden" % name)
+        if not isinstance(chal.get("flags", []), list) or not isinstance(
+            chal.get("tags", []), list
+        ):
+            errors.append("Challenge %s: flags and tags must be lists" % name)
+            continue
+        for flag in chal.get("flags", []):
+            errors.extend(
+                "Challenge %s: %s" % (name, e) for e in validate_import_flag(flag)
+            )
+        for tag in chal.get("tags", []):
+            if not isinstance(tag, str) or not tag.strip():
+                errors.append(
+                    "Challenge %s: tag %r must be a non-empty string" % (name, tag)
+                )
+    return errors
+
+
+def validate_import_flag(flag: Any) -> List[str]:
+    """
+    Checks a manifest flag, which is either the content of a static flag or a mapping
+    with `content` and optional `type` and `data`.
+    """
+    if not isinstance(flag, dict):
+        flag = {"content": flag}
+    errors = list()
+    unknown = set(flag) - {"type", "content", "data"}
+    if unknown:
+        errors.append("unsupported flag fields %s" % ", ".join(sorted(unknown)))
+    if not isinstance(flag.get("content"), str) or not flag["content"]:
+        errors.append(
+            "flag content %r must be a non-empty string" % flag.get("content")
+        )
+    if flag.get("type", "static") not in FLAG_CLASSES:
+        errors.append(
+            "flag type '%s' must be one of %s"
+            % (flag.get("type"), ", ".join(sorted(FLAG_CLASSES)))
+        )
+    if flag.get("data", "") not in ("", "case_insensitive"):
+        errors.append("flag data must be empty or case_insensitive")
+    return errors
+
+
+podman_import_namespace = Namespace(
+    "podman_import", description="Endpoint to bulk import podman challenges"
+)
+
+
+@podman_import_namespace.route("", methods=["POST"])
+class PodmanImportAPI(Resource):
+    """
+    The purpose of this API is to create many Podman Challenges from a JSON or YAML manifest.
+    Every image is checked against the catalog before anything is written, and all
+    challenges, flags and tags are inserted in a single transaction.
+    """
+
+    @admins_only
+    def post(self):
+        podman = PodmanConfig.query.filter_by(id=1).first()
+        if podman is None:
+            return {"success": False, "errors": ["Podman is not configured"]}, 400
+
+        try:
+            upload = request.files.get("file")
+            if upload:
+                body = upload.read().decode("utf-8")
+                content_type = upload.filename or ""
+            else:
+                body = request.get_data().decode("utf-8")
+                content_type = request.content_type or ""
+            challenges = parse_import_manifest(body, content_type)
+        except Exception as e:
+            return {"success": False, "errors": [str(e)]}, 400
+
+        try:
+            # Images pulled for the event may be newer than the cached catalog
+            images = get_cached_repositories(podman, refresh=True)
+        except:
+            print(traceback.print_exc())
+            return {"success": False, "errors": ["Failed to Connect to Podman"]}, 400
+
+        errors = validate_import_manifest(challenges, images)
+        if errors:
+            return {"success": False, "errors": errors}, 400
+
+        try:
+            created = list()
+            for chal in challenges:
+                challenge = PodmanChallenge(
+                    name=chal["name"],
+                    description=chal.get("description", ""),
+                    category=chal.get("category", ""),
+                    value=int(chal.get("value") or 0),
+                    state=chal.get("state", "visible"),
+                    max_attempts=int(chal.get("max_attempts") or 0),
+                    type="podman",
+                    podman_image=chal["podman_image"],
+                    idle_timeout=int(chal.get("idle_timeout") or 0),
+                )
+                db.session.add(challenge)
+                created.append((challenge, chal))
+            # Assign challenge ids without committing
+            db.session.flush()
+
+            for challenge, chal in created:
+                for flag in chal.get("flags", []):
+                    if not isinstance(flag, dict):
+                        flag = {"content": flag}
+                    db.session.add(
+                        Flags(
+                            challenge_id=challenge.id,
+                            type=flag.get("type", "static"),
+                            content=flag["content"],
+                            data=flag.get("data", ""),
+                        )
+                    )
+                for tag in chal.get("tags", []):
+                    db.session.add(Tags(challenge_id=challenge.id, value=tag))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(traceback.print_exc())
+            return {"success": False, "errors": [str(e)]}, 400
+
+        return {
+            "success": True,
+            "data": [{"id": c.id, "name": c.name} for c, _ in created],
+        }
+
+
+def add_missing_sqlite_columns(app) -> None:
+    """
+    CTFd's plugin upgrade() only runs create_all() on SQLite, and create_all() never
+    adds columns to existing tables. So on SQLite, add any model columns missing from
+    the plugin's tables directly.
+    """
+    engine = app.db.engine
+    if engine.dialect.name != "sqlite":
+        return
+
+    inspector = sqlalchemy.inspect(engine)
+    for model in (PodmanConfig, PodmanChallengeTracker, PodmanChallenge):
+        table = model.__table__
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            logger.info("Adding column %s.%s", table.name, column.name)
+            with engine.begin() as conn:
+                conn.execute(
+                    sqlalchemy.text(
+                        "ALTER TABLE %s ADD COLUMN %s %s"
+                        % (
+                            table.name,
+                            column.name,
+                            column.type.compile(dialect=engine.dialect),
+                        )
+                    )
+                )
+                if column.index:
+                    conn.execute(
+                        sqlalchemy.text(
+                            "CREATE INDEX ix_%s_%s ON %s (%s)"
+                            % (table.name, column.name, table.name, column.name)
+                        )
+                    )
+                if table.name == "podman_challenge_tracker" and column.name == "status":
+                    # Same backfill as the alembic revision used on other databases
+                    conn.execute(
+                        sqlalchemy.text(
+                            "UPDATE podman_challenge_tracker SET status = 'failed' "
+                            "WHERE status IS NULL"
+                        )
+                    )
+
+
 def load(app):
     app.db.create_all()
+    upgrade(plugin_name="podman_challenges")
+    add_missing_sqlite_columns(app)
     CHALLENGE_CLASSES["podman"] = PodmanChallengeType
     register_plugin_assets_directory(app, base_path="/plugins/podman_challenges/assets")
     define_podman_admin(app)
@@ -753,3 +1698,6 @@ def load(app):
     CTFd_API_v1.add_namespace(container_namespace, "/container")
     CTFd_API_v1.add_namespace(active_podman_namespace, "/podman_status")
     CTFd_API_v1.add_namespace(kill_container, "/nuke")
+    CTFd_API_v1.add_namespace(podman_stats_namespace, "/podman_stats")
+    CTFd_API_v1.add_namespace(podman_import_namespace, "/podman_import")
+    start_stats_collector(app)
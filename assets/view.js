@@ -41,9 +41,18 @@ CTFd._internal.challenge.submit = function(preview) {
 };
 
 function get_podman_status(container) {
-    $.get("/api/v1/podman_status", function(result) {
+    $.get("/api/v1/podman_status", { 'name': container }, function(result) {
         $.each(result['data'], function(i, item) {
             if (item.podman_image == container) {
+                if (item.status == 'starting') {
+                    $('#podman_container').html('<div class="text-center"><i class="fas fa-circle-notch fa-spin fa-1x"></i> Waiting for container to become ready...</div>');
+                    setTimeout(function() { get_podman_status(container); }, 2000);
+                    return false;
+                }
+                if (item.status == 'failed') {
+                    $('#podman_container').html('<pre>Podman container failed to start.<br /><div class="mt-2"><a onclick="start_container(\'' + item.podman_image + '\');" class=\'btn btn-dark\'><small style=\'color:white;\'><i class="fas fa-redo"></i> Revert</small></a></div></pre>');
+                    return false;
+                }
                 var ports = String(item.ports).split(',');
                 var data = '';
                 $.each(ports, function(x, port) {
@@ -80,7 +89,7 @@ function start_container(container) {
         .fail(function(jqxhr, settings, ex) {
             ezal({
                 title: "Attention!",
-                body: "You can only revert a container once per 5 minutes! Please be patient.",
+                body: jqxhr.status == 403 ? "You can only revert a container once per 5 minutes! Please be patient." : "The container failed to start. Please try again.",
                 button: "Got it!"
             });
             $(get_podman_status(container));
@@ -0,0 +1,52 @@
+"""Add instance state and monitoring columns
+
+Revision ID: 123e769c5b79
+Revises:
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from CTFd.plugins.migrations import get_columns_for_table
+
+# revision identifiers, used by Alembic.
+revision = "123e769c5b79"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# (table, column, type, indexed) added to tables that predate this revision. Fresh
+# installs already get them from create_all().
+COLUMNS = [
+    ("podman_challenge_tracker", "status", sa.String(length=32), True),
+    ("podman_challenge_tracker", "last_active", sa.Integer(), True),
+    ("podman_challenge", "idle_timeout", sa.Integer(), False),
+    ("podman_config", "stats_interval", sa.Integer(), False),
+    ("podman_config", "trace_threshold", sa.Integer(), False),
+]
+
+
+def upgrade(op=None):
+    for table, name, type_, indexed in COLUMNS:
+        columns = get_columns_for_table(op=op, table_name=table, names_only=True)
+        if name in columns:
+            continue
+        op.add_column(table, sa.Column(name, type_, nullable=True))
+        if indexed:
+            op.create_index(op.f("ix_%s_%s" % (table, name)), table, [name])
+
+    # Instances launched before readiness tracking were created but never started,
+    # so let their owners revert them straight away.
+    op.execute(
+        "UPDATE podman_challenge_tracker SET status = 'failed' WHERE status IS NULL"
+    )
+
+
+def downgrade(op=None):
+    for table, name, type_, indexed in reversed(COLUMNS):
+        columns = get_columns_for_table(op=op, table_name=table, names_only=True)
+        if name not in columns:
+            continue
+        if indexed:
+            op.drop_index(op.f("ix_%s_%s" % (table, name)), table_name=table)
+        op.drop_column(table, name)
@@ -0,0 +1,31 @@
+"""Add public host
+
+Revision ID: 5f1c2a9e7d40
+Revises: 123e769c5b79
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from CTFd.plugins.migrations import get_columns_for_table
+
+# revision identifiers, used by Alembic.
+revision = "5f1c2a9e7d40"
+down_revision = "123e769c5b79"
+branch_labels = None
+depends_on = None
+
+
+def upgrade(op=None):
+    columns = get_columns_for_table(op=op, table_name="podman_config", names_only=True)
+    if "public_host" not in columns:
+        op.add_column(
+            "podman_config",
+            sa.Column("public_host", sa.String(length=256), nullable=True),
+        )
+
+
+def downgrade(op=None):
+    columns = get_columns_for_table(op=op, table_name="podman_config", names_only=True)
+    if "public_host" in columns:
+        op.drop_column("podman_config", "public_host")